@@ -35,11 +35,12 @@ command -v ffprobe >/dev/null || { echo "WARN: ffprobe not found"; }
 sed -i 's/\r$//' "$STATIONS_FILE" || true
 
 # --- Load stations: name,url,lang,cc[,ua,referer] OR name,url,lang[,ua,referer] ---
-# We only need name+url for recording; lang/cc are read later by transcribe_only.py.
-mapfile -t NAMES < <(awk -F',' 'BEGIN{OFS=","} /^[[:space:]]*#/ {next} NF>=3 {gsub(/^[[:space:]]+|[[:space:]]+$/,"",$1); if($1!="") print $1}' "$STATIONS_FILE")
-mapfile -t URLS  < <(awk -F',' 'BEGIN{OFS=","} /^[[:space:]]*#/ {next} NF>=2 {gsub(/^[[:space:]]+|[[:space:]]+$/,"",$2); if($2!="") print $2}' "$STATIONS_FILE")
-mapfile -t UAS   < <(awk -F',' 'BEGIN{OFS=","} /^[[:space:]]*#/ {next}      {gsub(/^[[:space:]]+|[[:space:]]+$/,"",$5); print $5}' "$STATIONS_FILE" 2>/dev/null || true)
-mapfile -t REFS  < <(awk -F',' 'BEGIN{OFS=","} /^[[:space:]]*#/ {next}      {gsub(/^[[:space:]]+|[[:space:]]+$/,"",$6); print $6}' "$STATIONS_FILE" 2>/dev/null || true)
+# We only need name+url(+ua/referer) for recording; lang/cc are read later by transcribe_only.py.
+# Both go through stations.py so quoting and optional columns are handled the same way.
+NAMES=(); URLS=(); UAS=(); REFS=()
+while IFS=$'\x1f' read -r n u ua ref; do
+  NAMES+=("$n"); URLS+=("$u"); UAS+=("$ua"); REFS+=("$ref")
+done < <(python stations.py "$STATIONS_FILE")
 
 if [ "${#NAMES[@]}" -eq 0 ] || [ "${#URLS[@]}" -eq 0 ]; then
   echo "ERROR: No stations found in $STATIONS_FILE"; exit 1
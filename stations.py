@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Single parser for stations.csv, shared by transcribe_only.py (lang/cc) and
+run_workflow.sh (name/url/ua/referer, via `python stations.py stations.csv`).
+"""
+import csv, sys
+from pathlib import Path
+
+FIELD_SEP = "\x1f"  # ASCII unit separator: never in a URL/UA, and keeps empty fields for `read`
+
+def load_stations(stations_csv: Path):
+    """
+    Return a list of (name, url, lang, cc, ua, referer) from CSV rows like:
+      name,url,lang,cc[,ua,referer]
+    or:
+      name,url,lang[,ua,referer]
+    A 4th column counts as cc when it is empty or ISO-2, or when all six columns are present.
+    Header is optional; lines starting with '#' are ignored. Quoted fields keep embedded commas.
+    """
+    stations = []
+    with stations_csv.open("r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            row = [c.strip() for c in row]
+            if len(row) < 3:
+                continue
+            name, url, lang = row[0], row[1], row[2]
+            if name.lower() == "name" and url.lower() == "url":
+                continue  # header row
+            cc, extra = "", row[3:]
+            if len(row) >= 6 or (len(row) >= 4 and len(row[3]) in (0, 2)):
+                cc = row[3].upper() if len(row[3]) == 2 else ""
+                extra = row[4:]
+            ua = extra[0] if len(extra) > 0 else ""
+            referer = extra[1] if len(extra) > 1 else ""
+            if name:
+                stations.append((name, url, lang, cc, ua, referer))
+    return stations
+
+def load_station_meta(stations_csv: Path):
+    """Return dict[name] -> (lang, cc) for stations that declare a language."""
+    return {name: (lang, cc) for name, _url, lang, cc, _ua, _ref in load_stations(stations_csv) if lang}
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(f"usage: {sys.argv[0]} STATIONS_CSV")
+    # One line per recordable station: name, url, ua, referer
+    for name, url, _lang, _cc, ua, referer in load_stations(Path(sys.argv[1])):
+        if url:
+            print(FIELD_SEP.join((name, url, ua, referer)))
+
+if __name__ == "__main__":
+    main()
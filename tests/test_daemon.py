@@ -0,0 +1,50 @@
+import os, socket, tempfile, unittest
+
+import transcribe_daemon as daemon
+
+class TaskErrorTest(unittest.TestCase):
+    def test_valid(self):
+        self.assertIsNone(daemon.task_error(["/out/A.wav", "fr", "FR", "260101"]))
+
+    def test_relative_path(self):
+        self.assertEqual(daemon.task_error(["live_output/A.wav", "fr", "FR", "260101"]), "wav path must be absolute")
+
+    def test_bad_shapes(self):
+        for task in (["/out/A.wav", "fr", "FR"], ["/out/A.wav", "fr", None, "260101"], "/out/A.wav", None, {}):
+            with self.subTest(task=task):
+                self.assertIsNotNone(daemon.task_error(task))
+
+class ClaimSocketTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "d.sock")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_missing_path(self):
+        daemon.claim_socket(self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_refuses_regular_file(self):
+        open(self.path, "w").close()
+        with self.assertRaises(SystemExit):
+            daemon.claim_socket(self.path)
+        self.assertTrue(os.path.isfile(self.path))
+
+    def test_removes_stale_socket(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(self.path)  # bound but never listening: connect is refused
+        daemon.claim_socket(self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_refuses_live_socket(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(self.path)
+            s.listen()
+            with self.assertRaises(SystemExit):
+                daemon.claim_socket(self.path)
+            self.assertTrue(os.path.exists(self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import contextlib, io, sys, tempfile, unittest
+from pathlib import Path
+from unittest import mock
+
+import stations
+
+class LoadStationsTest(unittest.TestCase):
+    """The row shapes load_stations() documents; run_workflow.sh records with the ua/referer it returns."""
+
+    def load(self, text):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "stations.csv"
+            path.write_text(text, encoding="utf-8")
+            return stations.load_stations(path)
+
+    def test_name_url_lang(self):
+        self.assertEqual(self.load("A,http://a,fr\n"), [("A", "http://a", "fr", "", "", "")])
+
+    def test_cc_column(self):
+        self.assertEqual(self.load("A,http://a,fr,fr\n"), [("A", "http://a", "fr", "FR", "", "")])
+
+    def test_cc_ua_referer(self):
+        self.assertEqual(self.load("A,http://a,fr,FR,Mozilla/5.0,http://ref\n"),
+                         [("A", "http://a", "fr", "FR", "Mozilla/5.0", "http://ref")])
+
+    def test_ua_referer_without_cc(self):
+        self.assertEqual(self.load("A,http://a,fr,Mozilla/5.0,http://ref\n"),
+                         [("A", "http://a", "fr", "", "Mozilla/5.0", "http://ref")])
+
+    def test_ua_only_without_cc(self):
+        self.assertEqual(self.load("A,http://a,fr,Mozilla/5.0\n"), [("A", "http://a", "fr", "", "Mozilla/5.0", "")])
+
+    def test_empty_cc_keeps_ua_referer_in_place(self):
+        self.assertEqual(self.load("A,http://a,fr,,Mozilla/5.0,http://ref\n"),
+                         [("A", "http://a", "fr", "", "Mozilla/5.0", "http://ref")])
+
+    def test_six_columns_with_non_iso_cc(self):
+        self.assertEqual(self.load("A,http://a,fr,FRA,Mozilla/5.0,http://ref\n"),
+                         [("A", "http://a", "fr", "", "Mozilla/5.0", "http://ref")])
+
+    def test_header_comments_short_rows_and_quoting(self):
+        rows = self.load('name,url,lang,cc\n# A,http://x,fr\nshort,row\n\n'
+                         'B,http://b,en,GB,"Agent (X11, Linux)",\n')
+        self.assertEqual(rows, [("B", "http://b", "en", "GB", "Agent (X11, Linux)", "")])
+
+    def test_fields_are_stripped(self):
+        self.assertEqual(self.load(" A , http://a , fr , fr \n"), [("A", "http://a", "fr", "FR", "", "")])
+
+class StationsMainTest(unittest.TestCase):
+    def test_recorder_rows(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "stations.csv"
+            path.write_text("A,http://a,fr,FR,UA,http://ref\nB,,en\nC,http://c,\n", encoding="utf-8")
+            out = io.StringIO()
+            with mock.patch.object(sys, "argv", ["stations.py", str(path)]), contextlib.redirect_stdout(out):
+                stations.main()
+            meta = stations.load_station_meta(path)
+        sep = stations.FIELD_SEP
+        self.assertEqual(out.getvalue().splitlines(),
+                         [sep.join(("A", "http://a", "UA", "http://ref")), sep.join(("C", "http://c", "", ""))])
+        self.assertEqual(meta, {"A": ("fr", "FR"), "B": ("en", "")})
+
+if __name__ == "__main__":
+    unittest.main()
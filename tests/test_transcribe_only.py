@@ -0,0 +1,82 @@
+import contextlib, io, os, unittest
+
+import transcribe_only as tx
+
+class MergeWindowsTest(unittest.TestCase):
+    def test_merges_up_to_max(self):
+        self.assertEqual(tx.merge_windows([(0, 10), (12, 20), (25, 40)], 30), [(0, 20), (25, 40)])
+
+    def test_window_spans_gaps_when_it_fits(self):
+        self.assertEqual(tx.merge_windows([(0, 10), (15, 30)], 30), [(0, 30)])
+
+    def test_long_region_is_cut(self):
+        self.assertEqual(tx.merge_windows([(0, 70)], 30), [(0, 30), (30, 60), (60, 70)])
+
+    def test_long_region_flushes_pending_window(self):
+        self.assertEqual(tx.merge_windows([(0, 5), (10, 80)], 30), [(0, 5), (10, 40), (40, 70), (70, 80)])
+
+    def test_empty(self):
+        self.assertEqual(tx.merge_windows([], 30), [])
+
+class StationStatsTest(unittest.TestCase):
+    GOOD, MARGIN = -0.8, 0.1
+
+    def trusted(self, stats, station="A"):
+        return tx.station_trusted(stats, station, self.GOOD, self.MARGIN)
+
+    def test_first_probe_seeds_ema(self):
+        stats = {}
+        tx.record_station_result(stats, "A", -0.5, False)
+        self.assertEqual(stats["A"], [1, -0.5, 0])
+
+    def test_ema_update(self):
+        stats = {"A": [1, -0.5, 0]}
+        tx.record_station_result(stats, "A", -1.0, False)
+        a = tx.STATS_EMA_ALPHA
+        self.assertEqual(stats["A"], [2, round((1 - a) * -0.5 + a * -1.0, 4), 0])
+
+    def test_no_probe_and_no_skip_leaves_stats(self):
+        stats = {"A": [3, -0.5, 2]}
+        tx.record_station_result(stats, "A", None, False)
+        self.assertEqual(stats["A"], [3, -0.5, 2])
+
+    def test_trusted_after_min_runs_above_margin(self):
+        stats = {}
+        for _ in range(tx.STATS_MIN_RUNS - 1):
+            tx.record_station_result(stats, "A", -0.5, False)
+        self.assertFalse(self.trusted(stats))
+        tx.record_station_result(stats, "A", -0.5, False)
+        self.assertTrue(self.trusted(stats))
+
+    def test_not_trusted_below_margin(self):
+        self.assertFalse(self.trusted({"A": [10, self.GOOD + self.MARGIN / 2, 0]}))
+
+    def test_recheck_after_skips(self):
+        stats = {"A": [tx.STATS_MIN_RUNS, -0.5, 0]}
+        for _ in range(tx.STATS_RECHECK_EVERY):
+            self.assertTrue(self.trusted(stats))
+            tx.record_station_result(stats, "A", None, True)
+        self.assertFalse(self.trusted(stats))
+        tx.record_station_result(stats, "A", -0.5, False)  # the re-probe resets the skip count
+        self.assertEqual(stats["A"][2], 0)
+        self.assertTrue(self.trusted(stats))
+
+    def test_legacy_two_field_entry(self):
+        stats = {"A": [tx.STATS_MIN_RUNS, -0.5]}
+        self.assertTrue(self.trusted(stats))
+        tx.record_station_result(stats, "A", None, True)
+        self.assertEqual(stats["A"], [tx.STATS_MIN_RUNS, -0.5, 1])
+
+    def test_unknown_station(self):
+        self.assertFalse(self.trusted({}))
+
+class BuildTasksTest(unittest.TestCase):
+    def test_paths_are_absolute_and_unknown_stations_skipped(self):
+        meta = {"A": ("fr", "FR")}
+        with contextlib.redirect_stdout(io.StringIO()):
+            tasks = tx.build_tasks([os.path.join("live_output", "A.wav"), os.path.join("live_output", "B.wav")],
+                                   meta, "260101")
+        self.assertEqual(tasks, [(os.path.abspath(os.path.join("live_output", "A.wav")), "fr", "FR", "260101")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Long-running transcriber. Loads the model once (the tokenizer and Silero VAD stay
+cached after first use) and then serves WAVs from two sources:
+  - transcribe_only.py --daemon-socket PATH, which pushes its file list over a UNIX socket;
+  - optionally, a directory polled for new .wav files (--watch). run_workflow.sh
+    records to NAME.wav.part and renames when done, so any .wav seen is complete.
+Decoding flags are the same as transcribe_only.py's.
+"""
+import argparse, json, os, signal, socket, socketserver, stat, sys, threading, time
+from pathlib import Path
+import transcribe_only as tx  # caps native thread pools before numpy/faster_whisper load
+from stations import load_station_meta
+
+SOCKET_DEF       = os.environ.get("WHISPER_DAEMON_SOCKET") or "/tmp/radio-transcriber.sock"
+POLL_SECONDS_DEF = float(os.environ.get("WHISPER_DAEMON_POLL", "10"))
+
+class Transcriber:
+    """One loaded model; process_wav calls are serialized so socket and watcher can share it."""
+
+    def __init__(self, args):
+        self.opts = tx.build_opts(args, workers=1)
+        self.model = tx.load_serial_model(args, self.opts)
+        self.stats_file = args.stats_file
+        self.lock = threading.Lock()
+
+    def run(self, wav_path: str, lang: str, cc: str, date_str: str, tag: str) -> dict:
+        with self.lock:
+            wav = Path(wav_path)
+            if not wav.is_file():  # already handled by the other source
+                return {"wav": wav_path, "ok": False, "error": "missing"}
+            try:
+                out_path, probe_conf, skipped = tx.process_wav(self.model, wav, lang, cc, date_str, self.opts, tag)
+            except Exception as e:
+                print(f"{tag} ERROR {wav.name}: {e}")
+                return {"wav": wav_path, "ok": False, "error": str(e)}
+            tx.record_station_result(self.opts["stats"], wav.stem, probe_conf, skipped)
+            tx.save_station_stats(self.stats_file, self.opts["stats"])
+            return {"wav": wav_path, "ok": True, "txt": str(out_path)}
+
+def task_error(task):
+    """Why a task can't be run, or None. Paths must be absolute: the daemon's cwd is not the client's."""
+    if not (isinstance(task, list) and len(task) == 4 and all(isinstance(f, str) for f in task)):
+        return "task must be [wav, lang, cc, date] strings"
+    if not os.path.isabs(task[0]):
+        return "wav path must be absolute"
+    return None
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON line in ({"tasks": [[wav, lang, cc, date], ...]}), one JSON line out per task."""
+
+    def reply(self, obj):
+        self.wfile.write((json.dumps(obj) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                tasks = json.loads(line).get("tasks", [])
+            except (ValueError, AttributeError) as e:
+                self.reply({"error": f"bad request: {e}", "done": True})
+                continue
+            if not isinstance(tasks, list):
+                self.reply({"error": "bad request: tasks must be a list", "done": True})
+                continue
+            for task in tasks:
+                error = task_error(task)
+                if error:
+                    wav = task[0] if isinstance(task, list) and task else task
+                    self.reply({"wav": str(wav), "ok": False, "error": error})
+                    continue
+                wav_path, lang, cc, date_str = task
+                self.reply(self.server.transcriber.run(wav_path, lang, cc, date_str, "[socket]"))
+            self.reply({"done": True})
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def watch_pass(transcriber: Transcriber, directory: Path, stations_csv: Path, warned: set, failed: set):
+    """
+    One scan of directory: transcribe each WAV of a known station. A WAV that failed is
+    remembered by (path, mtime) and skipped until a new recording replaces it.
+    """
+    meta = load_station_meta(stations_csv)
+    with os.scandir(directory) as it:
+        wavs = [(e.path, e.stat(follow_symlinks=False).st_mtime_ns) for e in it
+                if e.name.endswith(".wav") and e.is_file(follow_symlinks=False)]
+    wavs.sort()
+    for wav_path, mtime_ns in wavs:
+        if (wav_path, mtime_ns) in failed:
+            continue
+        station = os.path.basename(wav_path)[:-len(".wav")]
+        lang, cc = meta.get(station, (None, ""))
+        if not lang:
+            if station not in warned:
+                print(f"[watch] Skip '{station}': not in stations CSV.")
+                warned.add(station)
+            continue
+        # Not the cached run date: a daemon outlives midnight
+        res = transcriber.run(wav_path, lang, cc, tx.amsterdam_date(), "[watch]")
+        if not res["ok"] and res.get("error") != "missing":
+            print(f"[watch] Not retrying {os.path.basename(wav_path)} until it is replaced.")
+            failed.add((wav_path, mtime_ns))
+
+def watch_dir(transcriber: Transcriber, directory: Path, stations_csv: Path, poll_seconds: float):
+    """Poll directory for WAVs of known stations; stations.csv is re-read each pass."""
+    warned, failed = set(), set()
+    while True:
+        try:
+            watch_pass(transcriber, directory, stations_csv, warned, failed)
+        except Exception as e:  # keep the watcher alive through a bad CSV or a vanished directory
+            print(f"[watch] ERROR: {e}")
+        time.sleep(poll_seconds)
+
+def claim_socket(path: str):
+    """Remove a stale socket left by a previous run; refuse anything else at that path."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        sys.exit(f"{path} exists and is not a socket; refusing to remove it.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(path)
+        except ConnectionRefusedError:
+            pass  # nobody listening: stale
+        except OSError as e:
+            sys.exit(f"Can't check {path}: {e}")
+        else:
+            sys.exit(f"Another daemon is already listening on {path}.")
+    try:
+        os.unlink(path)
+    except OSError as e:
+        sys.exit(f"Can't remove stale socket {path}: {e}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Keep a Whisper model loaded and transcribe WAVs as they arrive.")
+    ap.add_argument("--stations", type=Path, required=True, help="Stations CSV (needs at least name,url,lang; optional cc).")
+    ap.add_argument("--socket", default=SOCKET_DEF, help=f"UNIX socket to listen on (default {SOCKET_DEF}).")
+    ap.add_argument("--watch", type=Path, help="Also poll this directory for new .wav files.")
+    ap.add_argument("--poll-seconds", type=float, default=POLL_SECONDS_DEF,
+                    help=f"Polling interval for --watch (default {POLL_SECONDS_DEF:g}).")
+    tx.add_model_args(ap)
+    args = ap.parse_args()
+
+    claim_socket(args.socket)  # before the model load, so a second daemon fails fast
+    transcriber = Transcriber(args)
+    print(f"Model={transcriber.opts['model']} | backend={args.backend} | cpu_threads={args.cpu_threads} | "
+          f"socket={args.socket} | watch={args.watch or 'off'}")
+
+    if args.watch:
+        threading.Thread(target=watch_dir, args=(transcriber, args.watch, args.stations, args.poll_seconds),
+                         daemon=True).start()
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # so the socket file gets removed
+    with Server(args.socket, RequestHandler) as server:
+        server.transcriber = transcriber
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(args.socket)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
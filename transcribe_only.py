@@ -1,47 +1,236 @@
 #!/usr/bin/env python3
-import argparse, csv, os, statistics, sys
+import os
+
+# Cap OpenMP/MKL/OpenBLAS/Numba pools before numpy or faster_whisper load them, so VAD
+# and resampling don't oversubscribe the CPU. cpu_threads stays the only knob for
+# CTranslate2's own pool. Explicit env values still win.
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMBA_NUM_THREADS")
+for _k in THREAD_ENV_VARS:
+    os.environ.setdefault(_k, "1")
+
+import argparse, json, mmap, re, socket, statistics, subprocess, sys, threading, wave
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from faster_whisper import WhisperModel
+from types import SimpleNamespace
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio, download_model
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from stations import load_station_meta
 
 # ===== Defaults (override via flags or env) =====
 MODEL_SIZE        = os.environ.get("WHISPER_MODEL", "small")
+# Local CTranslate2 model directory. Filled once from the hub if empty; afterwards the
+# weights are loaded (mmapped) straight from disk without any hub lookups. To use
+# pre-quantized weights instead, convert once and point WHISPER_MODEL_DIR at the output:
+#   ct2-transformers-converter --model openai/whisper-small --quantization int8_float32 \
+#     --output_dir models/small-ct2-int8 --copy_files tokenizer.json preprocessor_config.json
+MODEL_DIR_DEF     = Path(os.environ.get("WHISPER_MODEL_DIR",
+                                        Path(__file__).resolve().parent / "models" / f"{MODEL_SIZE}-ct2"))
+# Optional ONNX Runtime + OpenVINO EP backend (Intel AVX512-VNNI CPUs). Export and
+# quantize once with optimum, then point WHISPER_ORT_MODEL_DIR at the result:
+#   optimum-cli export onnx --model openai/whisper-small --task automatic-speech-recognition whisper-onnx/
+#   optimum-cli onnxruntime quantize --onnx_model whisper-onnx --avx512_vnni -o models/whisper-small-onnx
+BACKEND_DEF       = os.environ.get("WHISPER_BACKEND", "ct2")         # ct2 | ort-openvino
+ORT_MODEL_DIR_DEF = Path(os.environ.get("WHISPER_ORT_MODEL_DIR",
+                                        Path(__file__).resolve().parent / "models" / f"whisper-{MODEL_SIZE}-onnx"))
 CPU_THREADS_DEF   = int(os.environ.get("CT2_CPU_THREADS", "2"))     # good for GitHub 2 vCPU
+# "auto" lets CTranslate2 pick the fastest type for the host CPU: int8_float32 on
+# AVX512-VNNI (VNNI dot-products), int8 on ARM NEON. Plain int8 without VNNI can be
+# slower than float32 because of dequantization overhead.
+COMPUTE_TYPE_DEF  = os.environ.get("CT2_COMPUTE_TYPE", "auto")
+QUANT_CHOICES     = ("auto", "int8", "int8_float32")
+WORKERS_DEF       = int(os.environ.get("WHISPER_WORKERS", "0"))      # 0 = auto
 VAD_ON_DEF        = os.environ.get("WHISPER_VAD", "1") == "1"       # VAD enabled by default
+# Silero VAD settings: drop silence/music gaps longer than 0.5 s, keep 0.2 s of padding
+VAD_PARAMS        = {"min_silence_duration_ms": 500, "speech_pad_ms": 200}
 PROBE_SECONDS_DEF = int(os.environ.get("WHISPER_PROBE_SECONDS", "90"))
 THRESH_GOOD_DEF   = float(os.environ.get("WHISPER_THRESH_GOOD", "-0.80"))
 THRESH_BAD_DEF    = float(os.environ.get("WHISPER_THRESH_BAD", "-0.90"))
 GREEDY_BEAM_DEF   = int(os.environ.get("WHISPER_GREEDY_BEAM", "1"))
-FALLBACK_BEAM_DEF = int(os.environ.get("WHISPER_FALLBACK_BEAM", "5"))
+# The fallback decode always runs unbatched: model.transcribe keeps faster-whisper's stock
+# temperature cascade (only windows that trip compression-ratio/logprob are re-decoded
+# hotter, so the average cost stays near greedy), which the batched pipeline drops.
+FALLBACK_BEAM_DEF = int(os.environ.get("WHISPER_FALLBACK_BEAM", "1"))
+CHUNK_MODE_DEF    = os.environ.get("WHISPER_CHUNK_MODE", "off")     # off | ffmpeg | vad
+CHUNK_SECONDS_DEF = float(os.environ.get("WHISPER_CHUNK_SECONDS", "30"))
+BATCH_SIZE_DEF    = int(os.environ.get("WHISPER_BATCH_SIZE", "4"))   # 1 = unbatched decode
+SAMPLE_RATE       = 16000
+WAV_HEADER_SLACK  = 4096   # bytes of RIFF/LIST headers tolerated beyond the PCM data
+# Per-station confidence history, fed only by probe logprobs so every sample is measured
+# the same way. Stations whose EMA sits comfortably above the good threshold skip the
+# probe and go straight to greedy, but are re-probed every STATS_RECHECK_EVERY runs.
+STATS_FILE_DEF    = Path(os.environ.get("WHISPER_STATS_FILE",
+                                        Path.home() / ".cache" / "radio-transcriber" / "station_stats.json"))
+SKIP_MARGIN_DEF   = float(os.environ.get("WHISPER_SKIP_MARGIN", "0.10"))
+STATS_MIN_RUNS    = 3
+STATS_EMA_ALPHA   = 0.3
+STATS_RECHECK_EVERY = 5
+# Optional persistent transcribe_daemon.py; when it answers on this socket, files are
+# handed to its already-loaded model instead of loading one here.
+DAEMON_SOCKET_DEF = os.environ.get("WHISPER_DAEMON_SOCKET", "")
 # =================================================
 
-def load_station_meta(stations_csv: Path):
+_MODEL_SINGLETON = None
+_MODEL_KEY = None
+_MODEL_LOCK = threading.Lock()
+_PIPELINE = None
+
+def resolve_model_dir(model_dir: Path, size: str) -> str:
     """
-    Return dict[name] -> (lang, cc) from CSV rows like:
-      name,url,lang,cc[,ua,referer]
-    or:
-      name,url,lang[,ua,referer]
-    Header is optional; lines starting with '#' are ignored.
+    Return the local CTranslate2 model directory, downloading `size` into it on first use.
+    Falls back to the plain size name (hub cache) if the directory can't be populated.
     """
-    meta = {}
-    with stations_csv.open("r", encoding="utf-8") as f:
-        for raw in f:
-            s = raw.strip()
-            if not s or s.startswith("#"):
-                continue
-            row = next(csv.reader([s]))
-            row = [c.strip() for c in row]
-            if len(row) < 3:
-                continue
-            name, url, lang = row[0], row[1], row[2]
-            cc = ""
-            # If a 4th col exists and looks like ISO-2
-            if len(row) >= 4 and len(row[3]) == 2:
-                cc = row[3].upper()
-            if name and lang:
-                meta[name] = (lang, cc)
-    return meta
+    if (model_dir / "model.bin").is_file():
+        return str(model_dir)
+    try:
+        print(f"Fetching '{size}' into {model_dir} (one-time)...")
+        return download_model(size, output_dir=str(model_dir))
+    except Exception as e:
+        print(f"WARN: could not populate {model_dir} ({e}); loading '{size}' via the hub cache.")
+        return size
+
+def prefault_model(model_ref: str):
+    """
+    Ask the kernel to read model.bin into the page cache ahead of time (MADV_WILLNEED),
+    so loading the weights doesn't stall on cold disk reads. Best-effort: a no-op for
+    hub names, on platforms without madvise, or on any I/O error.
+    """
+    bin_path = Path(model_ref) / "model.bin"
+    if not bin_path.is_file() or not hasattr(mmap, "MADV_WILLNEED"):
+        return
+    try:
+        with bin_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.madvise(mmap.MADV_WILLNEED)
+    except (OSError, ValueError):
+        pass
+
+class OrtWhisperModel:
+    """
+    Stand-in for WhisperModel running an optimum-exported Whisper on ONNX Runtime with
+    the OpenVINO execution provider. Needs the optional extras
+    (pip install optimum[onnxruntime] onnxruntime-openvino transformers).
+    Covers only what this script calls: transcribe(audio, language=, beam_size=) ->
+    (segments, info). VAD/temperature options are ignored, and segments carry no
+    avg_logprob, so the probe and station stats are skipped on this backend.
+    """
+    def __init__(self, model_dir: str, threads: int):
+        try:
+            import onnxruntime as ort
+            from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+            from transformers import AutoProcessor, pipeline
+        except ImportError as e:
+            raise RuntimeError(f"--backend ort-openvino needs optimum, onnxruntime-openvino and transformers ({e})") from e
+        so = ort.SessionOptions()
+        so.intra_op_num_threads = threads
+        model = ORTModelForSpeechSeq2Seq.from_pretrained(model_dir, provider="OpenVINOExecutionProvider",
+                                                         session_options=so)
+        processor = AutoProcessor.from_pretrained(model_dir)
+        self._asr = pipeline("automatic-speech-recognition", model=model, tokenizer=processor.tokenizer,
+                             feature_extractor=processor.feature_extractor, chunk_length_s=30)
+
+    def transcribe(self, audio, language=None, beam_size=1, **_unused):
+        out = self._asr({"raw": audio, "sampling_rate": SAMPLE_RATE}, return_timestamps=True,
+                        generate_kwargs={"language": language, "task": "transcribe", "num_beams": beam_size})
+        segments = (SimpleNamespace(text=c["text"], start=c["timestamp"][0], end=c["timestamp"][1], avg_logprob=None)
+                    for c in out.get("chunks", []))
+        return segments, None
+
+def get_model(size: str, threads: int, compute_type: str = COMPUTE_TYPE_DEF, num_workers: int = 1,
+              backend: str = "ct2") -> WhisperModel:
+    """
+    Lazily build one WhisperModel per process and hand the same instance back on
+    every call. A different (size, threads, compute_type, num_workers, backend) replaces
+    the cached instance. num_workers > 1 lets several threads call transcribe() at once.
+    For backend "ort-openvino", size is the exported ONNX model directory.
+    """
+    global _MODEL_SINGLETON, _MODEL_KEY, _PIPELINE
+    key = (size, threads, compute_type, num_workers, backend)
+    with _MODEL_LOCK:
+        if _MODEL_SINGLETON is None or _MODEL_KEY != key:
+            if backend == "ort-openvino":
+                _MODEL_SINGLETON = OrtWhisperModel(size, threads)
+            else:
+                prefault_model(size)
+                _MODEL_SINGLETON = WhisperModel(size, device="cpu", compute_type=compute_type,
+                                                cpu_threads=threads, num_workers=num_workers)
+            _MODEL_KEY = key
+            _PIPELINE = None
+        return _MODEL_SINGLETON
+
+def get_pipeline(model: WhisperModel) -> BatchedInferencePipeline:
+    """BatchedInferencePipeline wrapping the cached model, built once per model."""
+    global _PIPELINE
+    with _MODEL_LOCK:
+        if _PIPELINE is None or _PIPELINE.model is not model:
+            _PIPELINE = BatchedInferencePipeline(model=model)
+        return _PIPELINE
+
+def amsterdam_date() -> str:
+    """Today's date (yymmdd, Amsterdam time)."""
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+    return datetime.now(ZoneInfo("Europe/Amsterdam")).strftime("%y%m%d")
+
+@lru_cache(1)
+def _amsterdam_date() -> str:
+    """Run date, computed once in the parent and shipped to workers."""
+    return amsterdam_date()
+
+def _is_count(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool) and v >= 0
+
+def load_station_stats(path: Path) -> dict:
+    """
+    Return dict[station] -> [n_probes, ema_logprob, skipped]; empty if the file is missing
+    or unreadable. Malformed entries are dropped; older [n, ema] entries get skipped=0.
+    """
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    stats = {}
+    for station, entry in raw.items():
+        if not isinstance(entry, list) or len(entry) not in (2, 3):
+            continue
+        n, ema, skipped = (entry + [0])[:3]
+        if (_is_count(n) and _is_count(skipped)
+                and (ema is None or isinstance(ema, (int, float)) and not isinstance(ema, bool))):
+            stats[station] = [n, ema, skipped]
+    return stats
+
+def save_station_stats(path: Path, stats: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(stats, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _stats_entry(stats: dict, station: str) -> list:
+    """[n_probes, ema_probe_logprob, runs_skipped_since_last_probe]"""
+    entry = list(stats.get(station, (0, None, 0)))
+    return (entry + [0, None, 0][len(entry):])[:3]
+
+def station_trusted(stats: dict, station: str, good_threshold: float, margin: float) -> bool:
+    n, ema, skipped = _stats_entry(stats, station)
+    return (n >= STATS_MIN_RUNS and ema is not None and ema >= good_threshold + margin
+            and skipped < STATS_RECHECK_EVERY)
+
+def update_station_stats(stats: dict, station: str, probe_conf: float):
+    n, ema, _skipped = _stats_entry(stats, station)
+    ema = probe_conf if n == 0 or ema is None else (1 - STATS_EMA_ALPHA) * ema + STATS_EMA_ALPHA * probe_conf
+    stats[station] = [n + 1, round(ema, 4), 0]
+
+def record_station_result(stats: dict, station: str, probe_conf, probe_skipped: bool):
+    """Fold one process_wav() outcome into the history."""
+    if probe_conf is not None:
+        update_station_stats(stats, station, probe_conf)
+    elif probe_skipped:
+        entry = _stats_entry(stats, station)
+        entry[2] += 1
+        stats[station] = entry
 
 def mean_logprob(segments) -> float:
     vals = []
@@ -51,89 +240,510 @@ def mean_logprob(segments) -> float:
             vals.append(lp)
     return statistics.mean(vals) if vals else -1.5
 
-def probe_confidence(model: WhisperModel, wav: Path, lang: str, vad: bool, probe_seconds: int) -> float:
+def _load_audio(path: Path) -> np.ndarray:
+    """
+    Decode a WAV to 16 kHz mono float32 once so every transcribe() call can reuse it.
+    The recorder writes 16 kHz mono s16le, which is read directly; anything else
+    goes through faster-whisper's decoder, which resamples. So does a WAV whose header
+    frame count is 0 or falls short of the file size (recorder killed before ffmpeg
+    fixed up the header), since the wave module would drop the unaccounted audio.
+    """
+    try:
+        with wave.open(str(path), "rb") as w:
+            if w.getframerate() == SAMPLE_RATE and w.getnchannels() == 1 and w.getsampwidth() == 2:
+                nframes = w.getnframes()
+                if nframes > 0 and nframes * 2 >= path.stat().st_size - WAV_HEADER_SLACK:
+                    pcm = w.readframes(nframes)
+                    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    except (wave.Error, EOFError):
+        pass
+    return decode_audio(str(path), sampling_rate=SAMPLE_RATE)
+
+def probe_confidence(model: WhisperModel, audio: np.ndarray, lang: str, probe_seconds: int):
     """
     Decode only the first ~probe_seconds by consuming the segment generator and breaking early.
-    Returns mean avg_logprob (higher is better).
+    Returns (mean avg_logprob, segments taken, reached_end). reached_end is True when the
+    generator was exhausted before the cutoff, i.e. the probe already covers the whole file.
+    The language is always given (no detection pass). VAD stays off so a quiet opening
+    can't starve the estimate of frames, and no prompt conditioning so earlier text
+    can't inflate the logprob.
     """
-    seg_gen, _info = model.transcribe(str(wav), language=lang, vad_filter=vad, beam_size=GREEDY_BEAM_DEF)
+    seg_gen, _info = model.transcribe(audio, language=lang, vad_filter=False, beam_size=GREEDY_BEAM_DEF,
+                                      initial_prompt=None, condition_on_previous_text=False)
     taken = []
     cutoff = float(probe_seconds)
     elapsed = 0.0
+    reached_end = True
     for seg in seg_gen:
         taken.append(seg)
         elapsed = getattr(seg, "end", elapsed)
         if elapsed and elapsed >= cutoff:
+            reached_end = False
             break
-    return mean_logprob(taken)
+    return mean_logprob(taken), taken, reached_end
 
-def full_transcribe(model: WhisperModel, wav: Path, lang: str, vad: bool, beam_size: int) -> str:
-    seg_gen, _info = model.transcribe(str(wav), language=lang, vad_filter=vad, beam_size=beam_size)
-    return " ".join(s.text.strip() for s in seg_gen)
+def join_segments(segments, logprobs=None) -> str:
+    # Plain list + single join; empty texts (e.g. VAD-trimmed silence) are dropped
+    # so they don't leave double spaces behind. If logprobs is a list, each
+    # segment's avg_logprob is appended to it on the way through.
+    parts = []
+    for s in segments:
+        if logprobs is not None and s.avg_logprob is not None:
+            logprobs.append(s.avg_logprob)
+        t = s.text.strip()
+        if t:
+            parts.append(t)
+    return " ".join(parts)
 
-def main():
-    ap = argparse.ArgumentParser(description="Transcribe WAVs (flat dir) with probe-then-decide beam strategy.")
-    ap.add_argument("--dir", type=Path, required=True, help="Directory containing .wav files (flat).")
-    ap.add_argument("--stations", type=Path, required=True, help="Stations CSV (needs at least name,url,lang; optional cc).")
+def full_segments(model: WhisperModel, audio: np.ndarray, lang: str, vad: bool, beam_size: int,
+                  batch_size: int = 1):
+    """
+    Segment generator over the whole file. With batch_size > 1 (and VAD on, which the
+    batched pipeline uses to cut the audio) the 30 s windows go through the encoder and
+    decoder batch_size at a time, giving CPU GEMMs enough rows to use all cores.
+    """
+    if batch_size > 1 and vad:
+        seg_gen, _info = get_pipeline(model).transcribe(audio, language=lang, vad_filter=True,
+                                                        vad_parameters=VAD_PARAMS, beam_size=beam_size,
+                                                        batch_size=batch_size)
+    else:
+        seg_gen, _info = model.transcribe(audio, language=lang, vad_filter=vad,
+                                          vad_parameters=VAD_PARAMS if vad else None, beam_size=beam_size)
+    return seg_gen
+
+def full_transcribe(model: WhisperModel, audio: np.ndarray, lang: str, vad: bool, beam_size: int,
+                    batch_size: int = 1, logprobs=None) -> str:
+    return join_segments(full_segments(model, audio, lang, vad, beam_size, batch_size), logprobs)
+
+def stream_transcribe(model: WhisperModel, audio: np.ndarray, lang: str, vad: bool, beam_size: int,
+                      out_path: Path, batch_size: int = 1):
+    """
+    Like full_transcribe, but each segment is written to disk as it is decoded, so the
+    transcript never sits in memory whole. Segments go to NAME.txt.part (tail that to
+    follow progress), which is renamed to out_path only once decoding completes; a
+    decode that fails partway removes it instead.
+    """
+    part_path = out_path.with_name(out_path.name + ".part")
+    try:
+        seg_gen = full_segments(model, audio, lang, vad, beam_size, batch_size)
+        with part_path.open("wb") as fh:
+            first = True
+            for s in seg_gen:
+                t = s.text.strip()
+                if not t:
+                    continue
+                if not first:
+                    fh.write(b" ")
+                fh.write(t.encode("utf-8"))
+                first = False
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+    os.replace(part_path, out_path)
+
+# ----- Chunked decoding: split one long file into ~30 s windows decoded in parallel -----
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+def vad_regions(audio):
+    """Speech regions as (start, end) sample offsets, via faster-whisper's Silero VAD."""
+    opts = VadOptions(**VAD_PARAMS)
+    return [(ts["start"], ts["end"]) for ts in get_speech_timestamps(audio, opts)]
+
+def ffmpeg_regions(audio: np.ndarray):
+    """
+    Non-silent regions as (start, end) sample offsets, via ffmpeg's silencedetect filter.
+    The already-decoded samples are piped in as raw float32, so the WAV isn't decoded twice.
+    """
+    total = len(audio)
+    try:
+        proc = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-nostdin", "-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", "1",
+             "-i", "pipe:0", "-af", "silencedetect=noise=-30dB:d=0.5", "-f", "null", "-"],
+            input=np.ascontiguousarray(audio, dtype=np.float32).tobytes(), capture_output=True,
+        )
+    except OSError as e:
+        raise RuntimeError(f"ffmpeg silencedetect failed: {e}") from e
+    stderr = proc.stderr.decode("utf-8", "replace")
+    if proc.returncode != 0:
+        # No matches would otherwise look like one long region, cut blindly every window
+        tail = stderr.strip().splitlines()[-1:] or ["no output"]
+        raise RuntimeError(f"ffmpeg silencedetect exited {proc.returncode}: {tail[0]}")
+    regions, cursor = [], 0  # cursor = start of the current non-silent region, None while in silence
+    for kind, value in _SILENCE_RE.findall(stderr):
+        pos = min(total, max(0, int(float(value) * SAMPLE_RATE)))
+        if kind == "start":
+            if cursor is not None and pos > cursor:
+                regions.append((cursor, pos))
+            cursor = None
+        else:
+            cursor = pos
+    # A file that ends in silence gets no final silence_end: nothing left to add
+    if cursor is not None and cursor < total:
+        regions.append((cursor, total))
+    return regions
+
+def merge_windows(regions, max_samples: int):
+    """
+    Greedily merge consecutive regions into windows of at most max_samples.
+    Regions longer than a window are cut into max_samples pieces.
+    """
+    windows = []
+    cur_s = cur_e = None
+    for s, e in regions:
+        while e - s > max_samples:
+            if cur_s is not None:
+                windows.append((cur_s, cur_e))
+                cur_s = None
+            windows.append((s, s + max_samples))
+            s += max_samples
+        if cur_s is None:
+            cur_s, cur_e = s, e
+        elif e - cur_s <= max_samples:
+            cur_e = e
+        else:
+            windows.append((cur_s, cur_e))
+            cur_s, cur_e = s, e
+    if cur_s is not None:
+        windows.append((cur_s, cur_e))
+    return windows
+
+def chunked_transcribe(model: WhisperModel, audio: np.ndarray, lang: str, vad: bool,
+                       beam_size: int, opts: dict, batch_size: int = 1) -> str:
+    """
+    Decode the file as independent windows on opts["chunk_workers"] threads and
+    concatenate the texts in order. Short files go through full_transcribe unchanged.
+    """
+    max_samples = int(opts["chunk_seconds"] * SAMPLE_RATE)
+    if len(audio) <= max_samples:
+        return full_transcribe(model, audio, lang, vad, beam_size, batch_size)
+
+    if opts["chunk_mode"] == "vad":
+        regions = vad_regions(audio)
+        vad = False  # windows are already speech-only
+    else:
+        regions = ffmpeg_regions(audio)
+    windows = merge_windows(regions, max_samples)
+
+    def run(win):
+        s, e = win
+        seg_gen, _info = model.transcribe(audio[s:e], language=lang, vad_filter=vad,
+                                          vad_parameters=VAD_PARAMS if vad else None, beam_size=beam_size)
+        return join_segments(seg_gen)
+
+    with ThreadPoolExecutor(max_workers=opts["chunk_workers"]) as ex:
+        texts = list(ex.map(run, windows))
+    return " ".join(t for t in texts if t)
+
+def process_wav(model: WhisperModel, wav: Path, lang: str, cc: str, date_str: str, opts: dict, tag: str):
+    """
+    Probe, pick a beam size, transcribe, save the .txt next to the WAV and delete the WAV.
+    Returns (transcript path, probe mean logprob or None if no probe ran,
+    whether the probe was skipped because the station is trusted).
+    """
+    station = wav.stem
+    audio = _load_audio(wav)  # decoded once, shared by probe and full pass
+    dur = len(audio) / SAMPLE_RATE
+    trusted = station_trusted(opts["stats"], station, opts["good_threshold"], opts["skip_margin"])
+    greedy_beam = max(1, opts["greedy_beam"])
+    fallback_beam = max(1, opts["fallback_beam"])
+    # Greedy goes through the batched pipeline (no temperature cascade) only on an
+    # unchunked VAD pass; otherwise an equal-beam fallback would be the very same decode.
+    greedy_batched = opts["batch_size"] > 1 and opts["vad"] and opts["chunk_mode"] == "off"
+    text = None
+    fallback = False
+    probe_conf, probe_skipped = None, False
+
+    if opts["backend"] != "ct2":
+        # No token logprobs to probe with: decode straight away
+        conf = None
+        chosen_beam = greedy_beam
+        print(f"{tag} {station} | lang={lang} | backend={opts['backend']} → greedy beam={chosen_beam}")
+    elif dur <= opts["probe_seconds"]:
+        # The probe would cover the whole file anyway: one greedy pass is both probe and result
+        logprobs = []
+        text = full_transcribe(model, audio, lang, opts["vad"], greedy_beam, logprobs=logprobs)
+        conf = statistics.mean(logprobs) if logprobs else None
+        # This pass was already unbatched, so only a different beam can change the result
+        if conf is not None and conf < opts["bad_threshold"] and fallback_beam != greedy_beam:
+            fallback, chosen_beam = True, fallback_beam
+            path = f"short file, fallback beam={chosen_beam}"
+            text = None
+        else:
+            chosen_beam = greedy_beam
+            path = f"short file, greedy beam={chosen_beam}"
+        conf_txt = f"{conf:.3f}" if conf is not None else "n/a"
+        print(f"{tag} {station} | lang={lang} | dur={dur:.0f}s | mean_logprob={conf_txt} → {path}")
+    elif fallback_beam == greedy_beam and not greedy_batched:
+        # Fallback would decode exactly like greedy: the probe can't change anything
+        conf = None
+        chosen_beam = greedy_beam
+        print(f"{tag} {station} | lang={lang} | fallback same as greedy → probe skipped, greedy beam={chosen_beam}")
+    elif trusted:
+        conf, probe_skipped = None, True
+        chosen_beam = greedy_beam
+        n_runs, ema, _skipped = _stats_entry(opts["stats"], station)
+        print(f"{tag} {station} | lang={lang} | ema_logprob={ema:.3f} over {n_runs} probes → "
+              f"probe skipped, greedy beam={chosen_beam}")
+    else:
+        # 1) Probe a short window with greedy to estimate confidence
+        conf, _taken, _reached_end = probe_confidence(model, audio, lang, opts["probe_seconds"])
+        probe_conf = conf
+        # Decide path
+        if conf < opts["bad_threshold"]:
+            fallback, chosen_beam = True, fallback_beam
+            path = f"fallback beam={chosen_beam} unbatched (temperature cascade)"
+        else:
+            chosen_beam = greedy_beam
+            # Optional: if conf between bad and good, you could set chosen_beam=3; we keep greedy for speed
+            path = f"greedy beam={chosen_beam}"
+
+        print(f"{tag} {station} | lang={lang} | mean_logprob_probe={conf:.3f} → {path}")
+
+    cc_part = (cc or "XX")
+    out_name = f"{date_str} - {cc_part} - {station} - Radio.txt"
+    out_path = wav.parent / out_name
+
+    # 2) Single full transcription with the chosen beam size, streamed straight to disk
+    #    unless the text is already in hand (short-file path) or assembled from chunks.
+    #    The fallback pass is never batched, so the temperature cascade can rescue it.
+    if text is None:
+        batch_size = 1 if fallback else opts["batch_size"]
+        if opts["chunk_mode"] != "off":
+            text = chunked_transcribe(model, audio, lang, opts["vad"], chosen_beam, opts, batch_size)
+        else:
+            stream_transcribe(model, audio, lang, opts["vad"], chosen_beam, out_path, batch_size)
+
+    # Save
+    if text is not None:
+        out_path.write_bytes(text.encode("utf-8"))
+    print(f"{tag} -> saved {out_name}")
+
+    # Clean up WAV
+    wav.unlink(missing_ok=True)
+    print(f"{tag} -> deleted {wav.name}")
+    return out_path, probe_conf, probe_skipped
+
+# ----- ProcessPool workers: one single-threaded model per process -----
+_WORKER_OPTS = None
+
+def _worker_init(cores, opts: dict):
+    """Pin this worker to one core; the native pool caps come from the import-time defaults."""
+    global _WORKER_OPTS
+    if cores is not None and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {cores.get_nowait()})
+        except Exception:
+            pass  # pinning is best-effort
+    _WORKER_OPTS = opts
+
+def _worker_run(task):
+    """task = (wav_path, lang, cc, date_str) -> (txt_path, ok, probe_conf, probe_skipped)"""
+    wav_path, lang, cc, date_str = task
+    wav = Path(wav_path)
+    tag = f"[pid {os.getpid()}]"
+    try:
+        model = get_model(_WORKER_OPTS["model"], 1, _WORKER_OPTS["compute_type"], backend=_WORKER_OPTS["backend"])
+        out_path, probe_conf, skipped = process_wav(model, wav, lang, cc, date_str, _WORKER_OPTS, tag)
+        return str(out_path), True, probe_conf, skipped
+    except Exception as e:
+        print(f"{tag} ERROR {wav.name}: {e}")
+        return "", False, None, False
+
+def run_parallel(tasks, workers: int, opts: dict, stats: dict) -> int:
+    """Fan the tasks out over a ProcessPool; returns the number of failures."""
+    ctx = mp.get_context()
+    cores = None
+    if hasattr(os, "sched_getaffinity"):
+        cores = ctx.Queue()
+        for c in sorted(os.sched_getaffinity(0))[:workers]:
+            cores.put(c)
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_worker_init, initargs=(cores, opts)) as ex:
+        futures = {ex.submit(_worker_run, t): Path(t[0]).stem for t in tasks}
+        for fut in as_completed(futures):
+            try:
+                _txt, ok, probe_conf, skipped = fut.result()
+            except Exception as e:  # e.g. BrokenProcessPool after a worker died
+                print(f"ERROR {futures[fut]}: {e!r}")
+                failures += 1
+                continue
+            if not ok:
+                failures += 1
+            else:
+                record_station_result(stats, futures[fut], probe_conf, skipped)
+    return failures
+
+def add_model_args(ap: argparse.ArgumentParser):
+    """Decoding/model flags shared by this script and transcribe_daemon.py."""
     ap.add_argument("--cpu-threads", type=int, default=CPU_THREADS_DEF, help=f"Threads per model (default {CPU_THREADS_DEF}).")
+    ap.add_argument("--backend", choices=("ct2", "ort-openvino"), default=BACKEND_DEF,
+                    help=f"Inference backend (default {BACKEND_DEF}); ort-openvino needs optional extras.")
+    ap.add_argument("--quant", choices=QUANT_CHOICES, default=COMPUTE_TYPE_DEF,
+                    help=f"Weight quantization / compute type (default {COMPUTE_TYPE_DEF}).")
     ap.add_argument("--probe-seconds", type=int, default=PROBE_SECONDS_DEF, help=f"Probe duration in seconds (default {PROBE_SECONDS_DEF}).")
     ap.add_argument("--good-threshold", type=float, default=THRESH_GOOD_DEF, help=f"Mean logprob ≥ this → greedy (default {THRESH_GOOD_DEF}).")
     ap.add_argument("--bad-threshold", type=float, default=THRESH_BAD_DEF, help=f"Mean logprob < this → fallback beam (default {THRESH_BAD_DEF}).")
     ap.add_argument("--greedy-beam", type=int, default=GREEDY_BEAM_DEF, help=f"Beam size for greedy path (default {GREEDY_BEAM_DEF}).")
     ap.add_argument("--fallback-beam", type=int, default=FALLBACK_BEAM_DEF, help=f"Beam size for fallback path (default {FALLBACK_BEAM_DEF}).")
     ap.add_argument("--no-vad", action="store_true", help="Disable VAD (default is ON).")
+    ap.add_argument("--stats-file", type=Path, default=STATS_FILE_DEF,
+                    help=f"Per-station confidence history (default {STATS_FILE_DEF}).")
+    ap.add_argument("--skip-margin", type=float, default=SKIP_MARGIN_DEF,
+                    help=f"Skip the probe once a station's EMA logprob ≥ good-threshold + this (default {SKIP_MARGIN_DEF}).")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE_DEF,
+                    help=f"Windows decoded per batch on the full pass; 1 disables batching (default {BATCH_SIZE_DEF}).")
+    ap.add_argument("--chunk-mode", choices=("off", "ffmpeg", "vad"), default=CHUNK_MODE_DEF,
+                    help=f"Split long files on silence and decode the windows in parallel (default {CHUNK_MODE_DEF}).")
+    ap.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS_DEF,
+                    help=f"Maximum window length for --chunk-mode (default {CHUNK_SECONDS_DEF:g}).")
+
+def build_opts(args, workers: int) -> dict:
+    """Resolve parsed flags into the opts dict process_wav() and the workers read."""
+    if args.backend != "ct2" and (args.batch_size > 1 or args.chunk_mode != "off"):
+        print(f"Note: --batch-size/--chunk-mode are CTranslate2 features; disabled for {args.backend}.")
+        args.batch_size, args.chunk_mode = 1, "off"
+    return {
+        "backend": args.backend,
+        "model": (str(ORT_MODEL_DIR_DEF) if args.backend == "ort-openvino"
+                  else resolve_model_dir(MODEL_DIR_DEF, MODEL_SIZE)),
+        "vad": VAD_ON_DEF and not args.no_vad,
+        "probe_seconds": args.probe_seconds,
+        "good_threshold": args.good_threshold,
+        "bad_threshold": args.bad_threshold,
+        "skip_margin": args.skip_margin,
+        "stats": load_station_stats(args.stats_file),
+        "greedy_beam": args.greedy_beam,
+        "fallback_beam": args.fallback_beam,
+        "compute_type": args.quant,
+        "batch_size": args.batch_size,
+        "chunk_mode": args.chunk_mode,
+        "chunk_seconds": args.chunk_seconds,
+        # Pool workers are single-threaded, so their chunks run one after another
+        "chunk_workers": 1 if workers > 1 else max(1, args.cpu_threads),
+    }
+
+def load_serial_model(args, opts: dict):
+    """The single in-process model used when files are handled one after another."""
+    # One model instance (best for 2-core runner). When chunking, split the thread
+    # budget across CTranslate2 workers so the windows decode concurrently.
+    compute_type = opts["compute_type"]
+    if opts["chunk_mode"] != "off":
+        chunk_workers = opts["chunk_workers"]
+        model = get_model(opts["model"], max(1, args.cpu_threads // chunk_workers), compute_type, chunk_workers)
+    else:
+        model = get_model(opts["model"], args.cpu_threads, compute_type, backend=opts["backend"])
+    effective = getattr(getattr(model, "model", None), "compute_type", None)
+    print(f"compute_type requested={compute_type} | effective={effective or 'unknown'}")
+    return model
+
+def send_to_daemon(sock_path: str, tasks):
+    """
+    Push tasks to a running transcribe_daemon.py (one JSON line out, one JSON line back
+    per task). Returns the number of failures, or None if nothing reached a daemon
+    (the caller then transcribes locally). Tasks left unanswered count as failures.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(sock_path)
+            s.sendall((json.dumps({"tasks": tasks}) + "\n").encode("utf-8"))
+        except OSError:
+            return None
+        failures = answered = 0
+        try:
+            with s.makefile("r", encoding="utf-8") as f:
+                for line in f:
+                    res = json.loads(line)
+                    if res.get("done"):
+                        if res.get("error"):
+                            print(f"WARN: daemon rejected the request: {res['error']}")
+                        break
+                    answered += 1
+                    if res.get("ok"):
+                        print(f"-> daemon saved {Path(res['txt']).name}")
+                    else:
+                        failures += 1
+                        print(f"-> daemon failed {Path(res['wav']).name}: {res.get('error')}")
+                else:
+                    print("WARN: daemon closed the connection early.")
+        except (OSError, ValueError) as e:
+            print(f"WARN: lost the daemon connection: {e}")
+    return failures + len(tasks) - answered
+
+def build_tasks(wavs, meta: dict, date_str: str):
+    """Resolve station metadata up front; only known stations become (wav, lang, cc, date) tasks."""
+    tasks = []
+    for wav_path in wavs:
+        station = os.path.basename(wav_path)[:-len(".wav")]
+        lang, cc = meta.get(station, (None, ""))
+        if not lang:
+            print(f"Skip '{station}': not in stations CSV.")
+            continue
+        # Absolute, since a daemon resolves paths against its own working directory
+        tasks.append((os.path.abspath(wav_path), lang, cc, date_str))
+    return tasks
+
+def main():
+    ap = argparse.ArgumentParser(description="Transcribe WAVs (flat dir) with probe-then-decide beam strategy.")
+    ap.add_argument("--dir", type=Path, required=True, help="Directory containing .wav files (flat).")
+    ap.add_argument("--stations", type=Path, required=True, help="Stations CSV (needs at least name,url,lang; optional cc).")
+    ap.add_argument("--workers", type=int, default=WORKERS_DEF,
+                    help="Parallel worker processes, each with a 1-thread model pinned to one core "
+                         "(default auto = min(files, cpu_count//2); 1 = single in-process model).")
+    ap.add_argument("--daemon-socket", default=DAEMON_SOCKET_DEF,
+                    help="Hand files to transcribe_daemon.py on this UNIX socket if it is running.")
+    add_model_args(ap)
     args = ap.parse_args()
 
     out_dir: Path = args.dir
     meta = load_station_meta(args.stations)
-    wavs = sorted(out_dir.glob("*.wav"))
+    # scandir gets the file type from readdir, so the name filter costs no stat calls
+    wavs = []
+    if out_dir.is_dir():
+        with os.scandir(out_dir) as it:
+            wavs = [e.path for e in it if e.name.endswith(".wav") and e.is_file(follow_symlinks=False)]
+    wavs.sort()
     if not wavs:
         print("No .wav files found.")
         return
 
-    vad = not args.no_vad
-    date_str = datetime.now(ZoneInfo("Europe/Amsterdam")).strftime("%y%m%d")
-
-    print(f"Model={MODEL_SIZE} | cpu_threads={args.cpu_threads} | vad={vad} | "
-          f"probe={args.probe_seconds}s | good≥{args.good_threshold:.2f} | bad<{args.bad_threshold:.2f} | "
-          f"greedy={args.greedy_beam} | fallback={args.fallback_beam}")
-
-    # One model instance (best for 2-core runner)
-    model = WhisperModel(MODEL_SIZE, device="cpu", compute_type="int8", cpu_threads=args.cpu_threads)
-
-    for i, wav in enumerate(wavs, 1):
-        station = wav.stem
-        lang, cc = meta.get(station, (None, ""))
-        if not lang:
-            print(f"[{i}/{len(wavs)}] Skip '{station}': not in stations CSV.")
-            continue
+    tasks = build_tasks(wavs, meta, _amsterdam_date())
+    if not tasks:
+        return
 
-        # 1) Probe a short window with greedy to estimate confidence
-        conf = probe_confidence(model, wav, lang, vad, args.probe_seconds)
-        # Decide path
-        if conf < args.bad_threshold:
-            chosen_beam = max(2, args.fallback_beam)
-            path = f"fallback beam={chosen_beam}"
-        else:
-            chosen_beam = max(1, args.greedy_beam)
-            # Optional: if conf between bad and good, you could set chosen_beam=3; we keep greedy for speed
-            path = f"greedy beam={chosen_beam}"
+    if args.daemon_socket:
+        failures = send_to_daemon(args.daemon_socket, tasks)
+        if failures is not None:
+            print(f"Daemon run complete (failures: {failures})")
+            return
+        print(f"No daemon on {args.daemon_socket}; transcribing locally.")
 
-        print(f"[{i}/{len(wavs)}] {station} | lang={lang} | mean_logprob_probe={conf:.3f} → {path}")
+    workers = args.workers if args.workers > 0 else min(len(tasks), max(1, (os.cpu_count() or 2) // 2))
+    workers = min(workers, len(tasks))
+    opts = build_opts(args, workers)
+    stats = opts["stats"]
 
-        # 2) Single full transcription with the chosen beam size
-        text = full_transcribe(model, wav, lang, vad, chosen_beam)
+    print(f"Model={opts['model']} | backend={args.backend} | workers={workers} | "
+          f"cpu_threads={args.cpu_threads if workers == 1 else 1} | vad={opts['vad']} | "
+          f"probe={args.probe_seconds}s | good≥{args.good_threshold:.2f} | bad<{args.bad_threshold:.2f} | "
+          f"greedy={args.greedy_beam} | fallback={args.fallback_beam} | batch={args.batch_size} | chunk={args.chunk_mode}")
 
-        # Save
-        cc_part = (cc or "XX")
-        out_name = f"{date_str} - {cc_part} - {station} - Radio.txt"
-        out_path = out_dir / out_name
-        out_path.write_text(text, encoding="utf-8")
-        print(f"-> saved {out_name}")
+    if workers > 1:
+        try:
+            failures = run_parallel(tasks, workers, opts, stats)
+            print(f"Parallel run complete (failures: {failures})")
+        finally:
+            save_station_stats(args.stats_file, stats)
+        return
 
-        # Clean up WAV
-        wav.unlink(missing_ok=True)
-        print(f"-> deleted {wav.name}")
+    model = load_serial_model(args, opts)
+    try:
+        for i, (wav_path, lang, cc, date_str) in enumerate(tasks, 1):
+            _out_path, probe_conf, skipped = process_wav(model, Path(wav_path), lang, cc, date_str, opts,
+                                                         f"[{i}/{len(tasks)}]")
+            record_station_result(stats, Path(wav_path).stem, probe_conf, skipped)
+    finally:
+        save_station_stats(args.stats_file, stats)  # keep earlier files' probes if one fails
 
 if __name__ == "__main__":
     try: